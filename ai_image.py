@@ -1,11 +1,25 @@
 import os
-import base64
+import pybase64
 from openai import OpenAI
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Fishing-specific prompt
+FISHING_PROMPT = """You are an expert fishing guide and angler with decades of experience. Analyze this fishing spot image and provide detailed recommendations.
+
+Please provide:
+1. **Structure Analysis**: Identify visible underwater structures, cover, vegetation, shoreline features
+2. **Fish Habitat Assessment**: What types of fish might be present based on the environment
+3. **Casting Recommendations**: Best spots to cast and why
+4. **Bait/Lure Suggestions**: What baits or lures would work best in this spot
+5. **Technique Tips**: Fishing techniques that would be most effective
+6. **Best Times**: When this spot would fish best (time of day, weather conditions)
+7. **Confidence Score**: Rate this spot 1-10 for fishing potential
+
+Format your response in a clear, actionable way that helps an angler succeed at this location."""
+
 def analyze_fishing_spot(image_bytes):
     """
     Analyze a fishing spot image using OpenRouter API with vision model
@@ -18,23 +32,9 @@ def analyze_fishing_spot(image_bytes):
         )
         
         # Convert image bytes to base64
-        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+        image_base64 = pybase64.b64encode(image_bytes).decode('ascii')
         image_url = f"data:image/jpeg;base64,{image_base64}"
         
-        # Create the fishing-specific prompt
-        fishing_prompt = """You are an expert fishing guide and angler with decades of experience. Analyze this fishing spot image and provide detailed recommendations.
-
-Please provide:
-1. **Structure Analysis**: Identify visible underwater structures, cover, vegetation, shoreline features
-2. **Fish Habitat Assessment**: What types of fish might be present based on the environment
-3. **Casting Recommendations**: Best spots to cast and why
-4. **Bait/Lure Suggestions**: What baits or lures would work best in this spot
-5. **Technique Tips**: Fishing techniques that would be most effective
-6. **Best Times**: When this spot would fish best (time of day, weather conditions)
-7. **Confidence Score**: Rate this spot 1-10 for fishing potential
-
-Format your response in a clear, actionable way that helps an angler succeed at this location."""
-
         # Make the API call
         completion = client.chat.completions.create(
             extra_headers={
@@ -48,7 +48,7 @@ Format your response in a clear, actionable way that helps an angler succeed at
                     "content": [
                         {
                             "type": "text",
-                            "text": fishing_prompt
+                            "text": FISHING_PROMPT
                         },
                         {
                             "type": "image_url",
@@ -1,36 +1,273 @@
 import os
-import base64
-import requests
+import io
+import asyncio
+import contextlib
+import math
+import pybase64
+import hashlib
+import random
+import re
+import time
+from collections import OrderedDict
+from functools import lru_cache
+import httpx
+import orjson
+import imagehash
+from PIL import Image, ImageOps
 from dotenv import load_dotenv
-from ai_usage_manager import AIUsageManager
+from ai_usage_manager import create_usage_manager
 
 # Load environment variables
 load_dotenv()
 
-# Initialize usage manager
-usage_manager = AIUsageManager()
+# Initialize usage manager (backend selected by USAGE_BACKEND)
+usage_manager = create_usage_manager()
 
-def analyze_fishing_spot_gemini(image_bytes):
+# Keep idle upstream connections (and the warm-up one) long enough to be reused
+KEEPALIVE_EXPIRY_SECONDS = 120
+
+# Shared async HTTP client - keeps connections alive and multiplexes
+# concurrent calls over HTTP/2 instead of blocking the event loop
+# (http2/limits live on the transport since a custom transport overrides the client's)
+CLIENT = httpx.AsyncClient(
+    timeout=30.0,
+    transport=httpx.AsyncHTTPTransport(
+        http2=True,
+        limits=httpx.Limits(
+            max_keepalive_connections=20,
+            max_connections=100,
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        # No transport retries - _post_with_backoff is the only retry layer
+    ),
+)
+
+async def warm_up_client():
     """
-    Analyze a fishing spot image using Google AI Studio (Gemini Pro Vision)
-    with smart usage management to stay within free tier limits
+    Open a connection to the Gemini API ahead of the first analysis so that
+    request doesn't pay for the TCP/TLS handshake (call on application startup)
     """
     try:
-        # Check if we can make a request
-        can_request, reason = usage_manager.can_make_request()
-        if not can_request:
-            return f"⚠️ Usage limit reached: {reason}\n\nPlease try again later or use the OpenRouter fallback."
+        await CLIENT.get("https://generativelanguage.googleapis.com/", timeout=5)
+    except httpx.HTTPError as e:
+        # Any response (even an error status) warms the pool - failures are harmless
+        print(f"Gemini connection warm-up failed: {str(e)}")
+
+async def close_client():
+    """Close the shared HTTP client (call on application shutdown)"""
+    await CLIENT.aclose()
+
+# Retry transient upstream failures in-process instead of bouncing them to the user
+MAX_ATTEMPTS = 3
+MAX_RETRY_DELAY = 10        # Seconds - don't hold a request open for long Retry-After values
+REQUEST_TIME_BUDGET = 60    # Seconds - upper bound on all attempts and waits combined
+RETRYABLE_STATUS_CODES = {429, 503}
+
+def _retry_delay(attempt, response=None):
+    """Seconds to wait before the next attempt, honoring Retry-After when present"""
+    delay = 2 ** attempt
+    if response is not None:
+        # HTTP-date form isn't parsed - keep the exponential delay
+        with contextlib.suppress(ValueError):
+            retry_after = float(response.headers.get("Retry-After", delay))
+            if math.isfinite(retry_after) and retry_after >= 0:
+                delay = retry_after
+    return min(delay, MAX_RETRY_DELAY) + random.uniform(0, 0.5)
+
+async def _post_with_backoff(url, build_content, headers=None):
+    """
+    POST with exponential backoff on 429/503 and connection errors, bounded by
+    REQUEST_TIME_BUDGET in total
+    build_content is called per attempt since a streamed body can only be sent once
+    """
+    deadline = time.monotonic() + REQUEST_TIME_BUDGET
+    for attempt in range(MAX_ATTEMPTS):
+        is_last_attempt = attempt == MAX_ATTEMPTS - 1
+        # Each attempt gets the usual timeout, cut short by what's left of the budget
+        timeout = min(CLIENT.timeout.read, deadline - time.monotonic())
+        try:
+            response = await CLIENT.post(url, content=build_content(), headers=headers, timeout=timeout)
+        except httpx.TransportError:
+            delay = _retry_delay(attempt)
+            if is_last_attempt or time.monotonic() + delay >= deadline:
+                raise
+            await asyncio.sleep(delay)
+            continue
         
-        # Get API key from environment
-        api_key = os.getenv("GOOGLE_AI_API_KEY")
-        if not api_key:
-            return "❌ Error: Google AI API key not found. Please set GOOGLE_AI_API_KEY in your .env file"
+        if response.status_code not in RETRYABLE_STATUS_CODES or is_last_attempt:
+            return response
         
-        # Convert image bytes to base64
-        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+        delay = _retry_delay(attempt, response)
+        if time.monotonic() + delay >= deadline:
+            return response
+        await asyncio.sleep(delay)
+
+# Response cache so re-uploads of the same image don't spend quota
+# Bump PROMPT_VERSION whenever the prompt changes to invalidate old entries
+PROMPT_VERSION = "v1"
+CACHE_MAX_ENTRIES = 500
+CACHE_TTL_SECONDS = 3600
+_CACHE: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+
+def _cache_key(image_bytes):
+    """Build the cache key for an image"""
+    return f"{hashlib.sha256(image_bytes).hexdigest()}:{PROMPT_VERSION}"
+
+def _cache_get(key):
+    """Return a cached analysis if present and not expired"""
+    entry = _CACHE.get(key)
+    if entry is None:
+        return None
+    
+    analysis, stored_at = entry
+    if time.time() - stored_at >= CACHE_TTL_SECONDS:
+        del _CACHE[key]
+        return None
+    
+    _CACHE.move_to_end(key)
+    return analysis
+
+def _cache_put(key, analysis):
+    """Store an analysis, evicting the least recently used entry when full"""
+    _CACHE[key] = (analysis, time.time())
+    _CACHE.move_to_end(key)
+    if len(_CACHE) > CACHE_MAX_ENTRIES:
+        _CACHE.popitem(last=False)
+
+# Perceptual-hash cache: re-photographs of the same spot produce different
+# bytes but near-identical hashes, so they can reuse an earlier analysis
+PHASH_MAX_DISTANCE = 6
+_PHASH_CACHE: "list[tuple[imagehash.ImageHash, str, float]]" = []
+
+# Gemini gains nothing from pixels past ~1024px but bills tokens for them
+MAX_IMAGE_DIMENSION = 1024
+JPEG_QUALITY = 85
+
+def _prepare_image(image_bytes):
+    """
+    Decode an upload once to compute its perceptual hash and a downscaled JPEG
+    Returns: (phash, upload_bytes) - (None, original bytes) if it can't be decoded
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            # Let the JPEG decoder scale down while decoding (no-op for other formats)
+            img.draft("RGB", (MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION))
+            
+            # Apply EXIF rotation since re-encoding drops the orientation tag
+            img = ImageOps.exif_transpose(img)
+            phash = imagehash.phash(img)
+            
+            img.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION), Image.LANCZOS)
+            buffer = io.BytesIO()
+            img.convert("RGB").save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True)
+            return phash, buffer.getvalue()
+    except Exception:
+        return None, image_bytes
+
+# Full-size decodes are memory-heavy, so limit how many run at once across all requests
+MAX_CONCURRENT_DECODES = 2
+_DECODE_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENT_DECODES)
+
+async def _prepare_image_async(image_bytes):
+    """Run _prepare_image in a worker thread, bounded by MAX_CONCURRENT_DECODES"""
+    async with _DECODE_SEMAPHORE:
+        return await asyncio.to_thread(_prepare_image, image_bytes)
+
+def _phash_cache_get(phash):
+    """Return the analysis of the closest cached image within PHASH_MAX_DISTANCE"""
+    if phash is None:
+        return None
+    
+    now = time.time()
+    _PHASH_CACHE[:] = [entry for entry in _PHASH_CACHE if now - entry[2] < CACHE_TTL_SECONDS]
+    
+    best_analysis = None
+    best_distance = PHASH_MAX_DISTANCE + 1
+    for cached_hash, analysis, _ in _PHASH_CACHE:
+        distance = phash - cached_hash
+        if distance < best_distance:
+            best_analysis, best_distance = analysis, distance
+    return best_analysis
+
+def _phash_cache_put(phash, analysis):
+    """Store an analysis under its perceptual hash, dropping the oldest when full"""
+    if phash is None:
+        return
+    
+    _PHASH_CACHE.append((phash, analysis, time.time()))
+    if len(_PHASH_CACHE) > CACHE_MAX_ENTRIES:
+        del _PHASH_CACHE[0]
+
+async def _format_usage_info():
+    """Format today's API usage for appending to an analysis"""
+    stats = await usage_manager.get_usage_stats()
+    return f"\n\n📊 **API Usage Today**: {stats['daily']['used']}/{stats['daily']['limit']} ({stats['daily']['percentage']:.1f}%)"
+
+# Input chunk for streamed base64 encoding - a multiple of 3 so chunks
+# encode without padding and concatenate into one valid base64 string
+BASE64_CHUNK_SIZE = 3 * 16 * 1024
+_IMAGE_DATA_PLACEHOLDER = "__IMAGE_DATA__"
+
+GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro-vision:generateContent?key={api_key}"
+
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "topK": 32,
+    "topP": 1,
+    "maxOutputTokens": 800,  # Reduced to save quota
+}
+
+SAFETY_SETTINGS = [
+    {
+        "category": "HARM_CATEGORY_HARASSMENT",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+    },
+    {
+        "category": "HARM_CATEGORY_HATE_SPEECH",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+    },
+    {
+        "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+    },
+    {
+        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+    }
+]
+
+def _image_part():
+    """Build an inline JPEG part whose data is streamed in by _stream_request_body"""
+    return {
+        "inline_data": {
+            "mime_type": "image/jpeg",
+            "data": _IMAGE_DATA_PLACEHOLDER
+        }
+    }
+
+def _split_payload(payload):
+    """Serialize payload once and split it around its image data placeholders"""
+    return tuple(orjson.dumps(payload).split(_IMAGE_DATA_PLACEHOLDER.encode()))
+
+async def _stream_request_body(pieces, images):
+    """
+    Stream pre-serialized JSON pieces with each image base64-encoded in
+    between, so the full encoded body is never built in memory
+    """
+    if len(pieces) != len(images) + 1:
+        raise ValueError("Payload placeholders don't match the number of images")
+    
+    for piece, image_bytes in zip(pieces[:-1], images, strict=True):
+        yield piece
         
-        # Create the optimized fishing-specific prompt (shorter to save tokens)
-        fishing_prompt = """As an expert fishing guide, analyze this spot and provide:
+        view = memoryview(image_bytes)
+        for start in range(0, len(view), BASE64_CHUNK_SIZE):
+            yield pybase64.b64encode(view[start:start + BASE64_CHUNK_SIZE])
+    
+    yield pieces[-1]
+
+# Optimized fishing-specific prompt (shorter to save tokens)
+FISHING_PROMPT = """As an expert fishing guide, analyze this spot and provide:
 
 🎯 **STRUCTURE**: Visible cover, vegetation, depth changes
 🐟 **FISH TYPES**: Likely species based on habitat
@@ -42,119 +279,212 @@ def analyze_fishing_spot_gemini(image_bytes):
 
 Keep response concise but actionable."""
 
-        # Prepare the request with optimized settings
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro-vision:generateContent?key={api_key}"
+# The single-spot request body never changes apart from the image, so it is
+# serialized once at import and only the base64 data is streamed per call
+_SPOT_PAYLOAD_PIECES = _split_payload({
+    "contents": [{
+        "parts": [
+            {"text": FISHING_PROMPT},
+            _image_part()
+        ]
+    }],
+    "generationConfig": GENERATION_CONFIG,
+    "safetySettings": SAFETY_SETTINGS
+})
+
+def _describe_error_response(response):
+    """Turn a non-200 Gemini response into a user-facing message"""
+    if response.status_code == 429:
+        return "⚠️ Rate limit exceeded. Please wait a moment and try again, or use the OpenRouter fallback."
+    
+    elif response.status_code == 400:
+        error_detail = response.json() if response.content else "Bad request"
+        return f"❌ Invalid request: {error_detail}. Please try with a different image."
+    
+    else:
+        error_detail = response.json() if response.content else "Unknown error"
+        return f"❌ API Error ({response.status_code}): {error_detail}"
+
+async def analyze_fishing_spot_gemini(image_bytes):
+    """
+    Analyze a fishing spot image using Google AI Studio (Gemini Pro Vision)
+    with smart usage management to stay within free tier limits
+    """
+    try:
+        # Serve repeat uploads from cache (doesn't count against quota)
+        cache_key = _cache_key(image_bytes)
+        cached_analysis = _cache_get(cache_key)
         
-        headers = {
-            "Content-Type": "application/json"
-        }
+        # Fall back to a near-duplicate match (decoding is CPU-bound, keep it off the event loop)
+        phash = None
+        if cached_analysis is None:
+            phash, image_bytes = await _prepare_image_async(image_bytes)
+            cached_analysis = _phash_cache_get(phash)
         
-        payload = {
-            "contents": [{
-                "parts": [
-                    {"text": fishing_prompt},
-                    {
-                        "inline_data": {
-                            "mime_type": "image/jpeg",
-                            "data": image_base64
-                        }
-                    }
-                ]
-            }],
-            "generationConfig": {
-                "temperature": 0.7,
-                "topK": 32,
-                "topP": 1,
-                "maxOutputTokens": 800,  # Reduced to save quota
-            },
-            "safetySettings": [
-                {
-                    "category": "HARM_CATEGORY_HARASSMENT",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                },
-                {
-                    "category": "HARM_CATEGORY_HATE_SPEECH",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                },
-                {
-                    "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                },
-                {
-                    "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                }
-            ]
-        }
+        if cached_analysis is not None:
+            return cached_analysis + "\n\n♻️ *Cached analysis - no API quota used.*" + await _format_usage_info()
         
-        # Make the API call
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
+        # Get API key from environment
+        api_key = os.getenv("GOOGLE_AI_API_KEY")
+        if not api_key:
+            return "❌ Error: Google AI API key not found. Please set GOOGLE_AI_API_KEY in your .env file"
         
-        if response.status_code == 200:
-            result = response.json()
-            if 'candidates' in result and len(result['candidates']) > 0:
-                # Record successful request
-                usage_manager.record_request()
-                
-                analysis = result['candidates'][0]['content']['parts'][0]['text']
-                
-                # Add usage stats to response
-                stats = usage_manager.get_usage_stats()
-                usage_info = f"\n\n📊 **API Usage Today**: {stats['daily']['used']}/{stats['daily']['limit']} ({stats['daily']['percentage']:.1f}%)"
-                
-                return analysis + usage_info
-            else:
-                return "❌ No analysis generated. The image might not be suitable for analysis. Please try with a clearer fishing spot photo."
+        # Reserve a request slot (released again below unless the call succeeds)
+        can_request, reason, reservation = await usage_manager.reserve_request()
+        if not can_request:
+            return f"⚠️ Usage limit reached: {reason}\n\nPlease try again later or use the OpenRouter fallback."
         
-        elif response.status_code == 429:
-            return "⚠️ Rate limit exceeded. Please wait a moment and try again, or use the OpenRouter fallback."
+        # Prepare the request with optimized settings
+        url = GEMINI_URL.format(api_key=api_key)
         
-        elif response.status_code == 400:
-            error_detail = response.json() if response.content else "Bad request"
-            return f"❌ Invalid request: {error_detail}. Please try with a different image."
+        succeeded = False
+        try:
+            # Make the API call
+            response = await _post_with_backoff(
+                url,
+                lambda: _stream_request_body(_SPOT_PAYLOAD_PIECES, [image_bytes]),
+                headers={"Content-Type": "application/json"},
+            )
+            
+            if response.status_code != 200:
+                return _describe_error_response(response)
+            
+            # Gemini bills every 200, even without candidate text - keep the reserved slot
+            succeeded = True
+        finally:
+            if not succeeded:
+                await usage_manager.release_request(reservation)
         
-        else:
-            error_detail = response.json() if response.content else "Unknown error"
-            return f"❌ API Error ({response.status_code}): {error_detail}"
+        result = orjson.loads(response.content)
+        try:
+            analysis = result['candidates'][0]['content']['parts'][0]['text']
+        except (KeyError, IndexError):
+            return "❌ No analysis generated. The image might not be suitable for analysis. Please try with a clearer fishing spot photo."
+        
+        _cache_put(cache_key, analysis)
+        _phash_cache_put(phash, analysis)
         
-    except requests.exceptions.Timeout:
+        # Add usage stats to response
+        return analysis + await _format_usage_info()
+        
+    except httpx.TimeoutException:
         return "⏱️ Request timed out. Please try again with a smaller image."
     
-    except requests.exceptions.ConnectionError:
+    except httpx.TransportError:
         return "🌐 Connection error. Please check your internet connection and try again."
     
     except Exception as e:
         print(f"Error analyzing image with Gemini: {str(e)}")
         return f"❌ Sorry, I couldn't analyze this image right now. Error: {str(e)}"
 
-def get_usage_stats():
-    """Get current API usage statistics"""
-    return usage_manager.get_usage_stats()
+# Batch analysis - several spots share one API call and one unit of quota
+MAX_BATCH_IMAGES = 16
+BATCH_MAX_OUTPUT_TOKENS = 2048
+# Matches heading-shaped lines only: "SPOT 1", "**Spot #2:** Rocky point", "## SPOT 3 - Dock"
+# (optional markup, then at most a short title after ":" or "-"). Body sentences
+# such as "Spot 1 is the stronger pick" are deliberately not headings.
+_SPOT_HEADING = re.compile(
+    r"^[#*\s]*SPOT\s*#?\s*(\d+)[*\s]*(?:[:\-–—][^\n]{0,60})?$",
+    re.IGNORECASE | re.MULTILINE,
+)
 
-# Fallback function using Hugging Face (free alternative)
-def analyze_fishing_spot_huggingface(image_bytes):
+def _split_batch_analysis(text, count):
     """
-    Fallback: Analyze a fishing spot image using Hugging Face Inference API
+    Split a batch response into per-spot sections using its SPOT k headings
+    Unless the headings are exactly SPOT 1..count in order, the whole response
+    is returned as the first result rather than guessing at the split
+    """
+    headings = list(_SPOT_HEADING.finditer(text))
+    if [int(heading.group(1)) for heading in headings] != list(range(1, count + 1)):
+        return [text.strip()] + ["ℹ️ See the combined analysis in the first result."] * (count - 1)
+    
+    sections = []
+    for i, heading in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+        # Keep the heading line itself - it often carries a description of the spot
+        sections.append(text[heading.start():end].strip())
+    return sections
+
+@lru_cache(maxsize=MAX_BATCH_IMAGES)
+def _batch_payload_pieces(count):
+    """Serialized batch request body for count images (built once per batch size)"""
+    batch_prompt = f"""As an expert fishing guide, analyze each of the following {count} fishing spots (images in order).
+Start each section with a line "SPOT k" (k = 1 to {count}) and for each spot provide:
+
+🎯 **STRUCTURE**, 🐟 **FISH TYPES**, 🎣 **CASTING SPOTS**, 🪝 **BAIT/LURES** (top 3),
+⚡ **TECHNIQUES**, ⏰ **TIMING** and 📊 **SCORE** (1-10 for fishing potential).
+
+Keep each section concise but actionable."""
+    
+    return _split_payload({
+        "contents": [{
+            "parts": [{"text": batch_prompt}] + [_image_part() for _ in range(count)]
+        }],
+        "generationConfig": {**GENERATION_CONFIG, "maxOutputTokens": BATCH_MAX_OUTPUT_TOKENS},
+        "safetySettings": SAFETY_SETTINGS
+    })
+
+async def analyze_fishing_spots_gemini_batch(images):
     """
+    Analyze several fishing spot images in a single Gemini request
+    Returns: one analysis string per image, in upload order
+    """
+    count = len(images)
     try:
-        api_key = os.getenv("HUGGINGFACE_API_KEY")
+        api_key = os.getenv("GOOGLE_AI_API_KEY")
         if not api_key:
-            return "❌ Error: Hugging Face API key not found. Please set HUGGINGFACE_API_KEY in your .env file"
+            return ["❌ Error: Google AI API key not found. Please set GOOGLE_AI_API_KEY in your .env file"] * count
         
-        # Use BLIP model for image captioning
-        API_URL = "https://api-inference.huggingface.co/models/Salesforce/blip-image-captioning-large"
-        headers = {"Authorization": f"Bearer {api_key}"}
-        
-        response = requests.post(API_URL, headers=headers, data=image_bytes, timeout=30)
+        # One request slot regardless of how many spots are analyzed
+        can_request, reason, reservation = await usage_manager.reserve_request()
+        if not can_request:
+            return [f"⚠️ Usage limit reached: {reason}\n\nPlease try again later or use the OpenRouter fallback."] * count
         
-        if response.status_code == 200:
-            result = response.json()
+        succeeded = False
+        try:
+            prepared = await asyncio.gather(*(_prepare_image_async(image_bytes) for image_bytes in images))
+            images = [image_bytes for _, image_bytes in prepared]
             
-            if isinstance(result, list) and len(result) > 0:
-                caption = result[0].get('generated_text', '')
-                
-                # Enhance the basic caption with fishing-specific analysis
-                enhanced_analysis = f"""🎣 **FISHING SPOT ANALYSIS** (Hugging Face Fallback)
+            response = await _post_with_backoff(
+                GEMINI_URL.format(api_key=api_key),
+                lambda: _stream_request_body(_batch_payload_pieces(count), images),
+                headers={"Content-Type": "application/json"},
+            )
+            
+            if response.status_code != 200:
+                return [_describe_error_response(response)] * count
+            
+            # Gemini bills every 200, even without candidate text - keep the reserved slot
+            succeeded = True
+        finally:
+            if not succeeded:
+                await usage_manager.release_request(reservation)
+        
+        result = orjson.loads(response.content)
+        try:
+            text = result['candidates'][0]['content']['parts'][0]['text']
+        except (KeyError, IndexError):
+            return ["❌ No analysis generated. The images might not be suitable for analysis. Please try with clearer fishing spot photos."] * count
+        
+        usage_info = await _format_usage_info()
+        return [section + usage_info for section in _split_batch_analysis(text, count)]
+        
+    except httpx.TimeoutException:
+        return ["⏱️ Request timed out. Please try again with fewer or smaller images."] * count
+    
+    except httpx.TransportError:
+        return ["🌐 Connection error. Please check your internet connection and try again."] * count
+    
+    except Exception as e:
+        print(f"Error analyzing image batch with Gemini: {str(e)}")
+        return [f"❌ Sorry, I couldn't analyze these images right now. Error: {str(e)}"] * count
+
+async def get_usage_stats():
+    """Get current API usage statistics"""
+    return await usage_manager.get_usage_stats()
+
+# Fishing advice wrapped around the Hugging Face image caption
+_HF_TEMPLATE = """🎣 **FISHING SPOT ANALYSIS** (Hugging Face Fallback)
 
 📸 **Image Description**: {caption}
 
@@ -170,8 +500,31 @@ Based on the visible features, here are some general suggestions:
 📊 **Confidence Score**: 6/10 - Basic analysis (upgrade to Gemini for detailed insights)
 
 💡 **Note**: This is a basic analysis. For detailed fishing recommendations, try again when Google AI quota resets."""
+
+# Fallback function using Hugging Face (free alternative)
+async def analyze_fishing_spot_huggingface(image_bytes):
+    """
+    Fallback: Analyze a fishing spot image using Hugging Face Inference API
+    """
+    try:
+        api_key = os.getenv("HUGGINGFACE_API_KEY")
+        if not api_key:
+            return "❌ Error: Hugging Face API key not found. Please set HUGGINGFACE_API_KEY in your .env file"
+        
+        # Use BLIP model for image captioning
+        API_URL = "https://api-inference.huggingface.co/models/Salesforce/blip-image-captioning-large"
+        headers = {"Authorization": f"Bearer {api_key}"}
+        
+        response = await _post_with_backoff(API_URL, lambda: image_bytes, headers=headers)
+        
+        if response.status_code == 200:
+            result = orjson.loads(response.content)
+            
+            if isinstance(result, list) and len(result) > 0:
+                caption = result[0].get('generated_text', '')
                 
-                return enhanced_analysis
+                # Enhance the basic caption with fishing-specific analysis
+                return _HF_TEMPLATE.format(caption=caption)
             else:
                 return "❌ Could not analyze the image. Please try again with a clearer photo."
         
@@ -1,5 +1,9 @@
+import asyncio
+import contextlib
+import copy
 import json
 import os
+from collections import deque
 from datetime import datetime, timedelta
 from typing import Dict, Optional
 import time
@@ -15,13 +19,30 @@ class AIUsageManager:
         self.daily_limit = 1500  # Google AI Studio daily limit
         self.minute_limit = 15   # Google AI Studio per-minute limit
         self.usage_data = self._load_usage_data()
+        self.flush_interval = 10       # Seconds between background saves
+        self._dirty = False
+        self._pending_write = None     # In-flight background save, if any
+        self._last_cleanup_day = None
+        self._lock = asyncio.Lock()
+        
+        # Sliding one-minute window of request timestamps (monotonic clock).
+        # Only needs to hold enough entries to tell whether the limit is hit.
+        self._minute_window = deque(maxlen=self.minute_limit + 1)
+    
+    def _prune_minute_window(self, now: float):
+        """Drop request timestamps older than 60 seconds"""
+        while self._minute_window and self._minute_window[0] <= now - 60:
+            self._minute_window.popleft()
     
     def _load_usage_data(self) -> Dict:
         """Load usage data from file"""
         if os.path.exists(self.usage_file):
             try:
                 with open(self.usage_file, 'r') as f:
-                    return json.load(f)
+                    usage_data = json.load(f)
+                # Per-minute counts are tracked in memory now
+                usage_data.pop("minute_usage", None)
+                return usage_data
             except (json.JSONDecodeError, FileNotFoundError):
                 return self._create_empty_usage()
         return self._create_empty_usage()
@@ -30,23 +51,51 @@ class AIUsageManager:
         """Create empty usage structure"""
         return {
             "daily_usage": {},
-            "minute_usage": {},
             "last_reset": datetime.now().isoformat()
         }
     
-    def _save_usage_data(self):
-        """Save usage data to file"""
-        with open(self.usage_file, 'w') as f:
-            json.dump(self.usage_data, f, indent=2)
+    def _save_usage_data(self, usage_data: Optional[Dict] = None):
+        """Save usage data (or a snapshot of it) to file"""
+        # Write to a temp file and swap it in so a crash mid-write can't leave a torn file
+        temp_file = f"{self.usage_file}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(usage_data if usage_data is not None else self.usage_data, f, indent=2)
+        os.replace(temp_file, self.usage_file)
+    
+    async def flush(self):
+        """Write pending usage changes to disk without blocking the event loop"""
+        # A cancelled flush leaves its worker thread writing - let it finish first
+        if self._pending_write is not None and not self._pending_write.done():
+            await asyncio.wait([self._pending_write])
+        
+        if not self._dirty:
+            return
+        
+        # Snapshot first so requests recorded mid-write aren't lost or torn
+        snapshot = copy.deepcopy(self.usage_data)
+        self._dirty = False
+        self._pending_write = asyncio.ensure_future(asyncio.to_thread(self._save_usage_data, snapshot))
+        try:
+            await asyncio.shield(self._pending_write)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._dirty = True
+            raise
+    
+    async def run_flush_loop(self):
+        """Periodically flush usage data to disk (run as a background task)"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error saving AI usage data: {str(e)}")
     
     def _get_today_key(self) -> str:
         """Get today's date key"""
         return datetime.now().strftime("%Y-%m-%d")
     
-    def _get_minute_key(self) -> str:
-        """Get current minute key"""
-        return datetime.now().strftime("%Y-%m-%d-%H-%M")
-    
     def _cleanup_old_data(self):
         """Remove old usage data to keep file size manageable"""
         today = datetime.now()
@@ -64,28 +113,48 @@ class AIUsageManager:
         
         for key in keys_to_remove:
             del self.usage_data["daily_usage"][key]
-        
-        # Clean minute usage (keep only last 2 hours)
-        cutoff_minute = today - timedelta(hours=2)
-        keys_to_remove = []
-        for minute_key in self.usage_data["minute_usage"]:
-            try:
-                minute_obj = datetime.strptime(minute_key, "%Y-%m-%d-%H-%M")
-                if minute_obj < cutoff_minute:
-                    keys_to_remove.append(minute_key)
-            except ValueError:
-                keys_to_remove.append(minute_key)
-        
-        for key in keys_to_remove:
-            del self.usage_data["minute_usage"][key]
     
-    def can_make_request(self) -> tuple[bool, str]:
+    async def can_make_request(self) -> tuple[bool, str]:
         """
-        Check if we can make a request within limits
+        Check if we can make a request within limits (doesn't reserve a slot)
         Returns: (can_make_request, reason_if_not)
         """
+        async with self._lock:
+            return self._check_limits()
+    
+    async def reserve_request(self) -> tuple[bool, str, Optional[tuple]]:
+        """
+        Atomically check the limits and count the request if allowed, so
+        concurrent callers can't all pass the check before any of them records
+        Returns: (reserved, reason_if_not, reservation) - pass the reservation
+        to release_request() if the API call ends up not being made or billed
+        """
+        async with self._lock:
+            can_request, reason = self._check_limits()
+            if not can_request:
+                return False, reason, None
+            return True, "", self._record()
+    
+    async def release_request(self, reservation: Optional[tuple]):
+        """Undo a reservation made by reserve_request()"""
+        if reservation is None:
+            return
+        
+        today_key, timestamp = reservation
+        async with self._lock:
+            daily_usage = self.usage_data["daily_usage"].get(today_key, 0)
+            if daily_usage > 0:
+                self.usage_data["daily_usage"][today_key] = daily_usage - 1
+            
+            # May already have been pruned from the window
+            with contextlib.suppress(ValueError):
+                self._minute_window.remove(timestamp)
+            
+            self._dirty = True
+    
+    def _check_limits(self) -> tuple[bool, str]:
+        """Check both limits (caller holds the lock)"""
         today_key = self._get_today_key()
-        minute_key = self._get_minute_key()
         
         # Check daily limit
         daily_usage = self.usage_data["daily_usage"].get(today_key, 0)
@@ -93,68 +162,228 @@ class AIUsageManager:
             return False, f"Daily limit reached ({daily_usage}/{self.daily_limit}). Resets at midnight."
         
         # Check minute limit
-        minute_usage = self.usage_data["minute_usage"].get(minute_key, 0)
-        if minute_usage >= self.minute_limit:
-            return False, f"Rate limit reached ({minute_usage}/{self.minute_limit}). Wait 1 minute."
+        self._prune_minute_window(time.monotonic())
+        if len(self._minute_window) >= self.minute_limit:
+            return False, f"Rate limit reached ({self.minute_limit}/{self.minute_limit}). Wait {self._seconds_until_slot():.0f} seconds."
         
         return True, ""
     
-    def record_request(self):
+    async def record_request(self):
         """Record a successful API request"""
+        async with self._lock:
+            self._record()
+    
+    def _record(self) -> tuple[str, float]:
+        """
+        Update the counters (caller holds the lock)
+        Returns: the (day key, timestamp) recorded
+        """
         today_key = self._get_today_key()
-        minute_key = self._get_minute_key()
         
         # Update daily usage
         self.usage_data["daily_usage"][today_key] = self.usage_data["daily_usage"].get(today_key, 0) + 1
         
-        # Update minute usage
-        self.usage_data["minute_usage"][minute_key] = self.usage_data["minute_usage"].get(minute_key, 0) + 1
+        # Update minute window
+        now = time.monotonic()
+        self._prune_minute_window(now)
+        self._minute_window.append(now)
         
-        # Cleanup old data
-        self._cleanup_old_data()
+        # Cleanup old data (once per day)
+        if self._last_cleanup_day != today_key:
+            self._cleanup_old_data()
+            self._last_cleanup_day = today_key
         
-        # Save to file
-        self._save_usage_data()
+        # Saved to file by the background flush loop
+        self._dirty = True
+        return today_key, now
     
-    def get_usage_stats(self) -> Dict:
+    async def get_usage_stats(self) -> Dict:
         """Get current usage statistics"""
         today_key = self._get_today_key()
-        minute_key = self._get_minute_key()
         
         daily_used = self.usage_data["daily_usage"].get(today_key, 0)
-        minute_used = self.usage_data["minute_usage"].get(minute_key, 0)
+        self._prune_minute_window(time.monotonic())
+        minute_used = min(len(self._minute_window), self.minute_limit)
         
-        return {
-            "daily": {
-                "used": daily_used,
-                "limit": self.daily_limit,
-                "remaining": self.daily_limit - daily_used,
-                "percentage": (daily_used / self.daily_limit) * 100
-            },
-            "minute": {
-                "used": minute_used,
-                "limit": self.minute_limit,
-                "remaining": self.minute_limit - minute_used,
-                "percentage": (minute_used / self.minute_limit) * 100
-            }
-        }
+        return _build_usage_stats(daily_used, self.daily_limit, minute_used, self.minute_limit)
+    
+    def _seconds_until_slot(self) -> float:
+        """Seconds until the oldest request leaves the one-minute window"""
+        if not self._minute_window:
+            return 0.0
+        return max(0.0, self._minute_window[0] + 60 - time.monotonic())
     
-    def wait_if_needed(self) -> Optional[int]:
+    async def wait_if_needed(self) -> Optional[int]:
         """
         Wait if we're hitting rate limits
         Returns: seconds waited (None if no wait needed)
         """
-        can_request, reason = self.can_make_request()
+        can_request, reason = await self.can_make_request()
         if can_request:
             return None
         
         if "Rate limit" in reason:
-            # Wait until next minute
-            now = datetime.now()
-            next_minute = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
-            wait_seconds = (next_minute - now).total_seconds()
+            # Wait until the oldest request leaves the window
+            wait_seconds = self._seconds_until_slot()
             print(f"Rate limit hit. Waiting {wait_seconds:.1f} seconds...")
-            time.sleep(wait_seconds)
+            await asyncio.sleep(wait_seconds)
             return int(wait_seconds)
         
-        return None
\ No newline at end of file
+        return None
+
+# Decrement only counters that still exist - a bare DECR on an expired key
+# would recreate it at -1 with no TTL. DECR keeps the key's existing TTL.
+_RELEASE_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        redis.call('DECR', key)
+    end
+end
+return 0
+"""
+
+class RedisUsageManager:
+    """
+    Redis-backed usage manager for multi-worker deployments, so every worker
+    shares the same counts. Same interface as AIUsageManager.
+    Per-minute usage is a fixed window per clock minute (atomic INCR/EXPIRE).
+    """
+    
+    def __init__(self, redis_url: Optional[str] = None, key_prefix="ai_usage"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ImportError("USAGE_BACKEND=redis requires the 'redis' package (pip install redis)") from e
+        
+        self.redis = redis.from_url(redis_url or os.getenv("REDIS_URL", "redis://localhost:6379/0"), decode_responses=True)
+        self.key_prefix = key_prefix
+        self.daily_limit = 1500  # Google AI Studio daily limit
+        self.minute_limit = 15   # Google AI Studio per-minute limit
+        self._release_script = self.redis.register_script(_RELEASE_SCRIPT)
+    
+    def _get_keys(self) -> tuple[str, str]:
+        """Get the (day, minute) counter keys for now"""
+        now = datetime.now()
+        return (
+            f"{self.key_prefix}:day:{now.strftime('%Y-%m-%d')}",
+            f"{self.key_prefix}:minute:{now.strftime('%Y-%m-%d-%H-%M')}",
+        )
+    
+    async def _get_counts(self) -> tuple[int, int]:
+        """Get the (daily, minute) request counts"""
+        day_key, minute_key = self._get_keys()
+        daily_used, minute_used = await self.redis.mget(day_key, minute_key)
+        return int(daily_used or 0), int(minute_used or 0)
+    
+    async def can_make_request(self) -> tuple[bool, str]:
+        """
+        Check if we can make a request within limits
+        Returns: (can_make_request, reason_if_not)
+        """
+        daily_used, minute_used = await self._get_counts()
+        
+        if daily_used >= self.daily_limit:
+            return False, f"Daily limit reached ({daily_used}/{self.daily_limit}). Resets at midnight."
+        
+        if minute_used >= self.minute_limit:
+            return False, f"Rate limit reached ({minute_used}/{self.minute_limit}). Wait {self._seconds_until_slot():.0f} seconds."
+        
+        return True, ""
+    
+    async def reserve_request(self) -> tuple[bool, str, Optional[tuple]]:
+        """
+        Atomically count the request and check the limits (INCR then compare),
+        rolling the counters back if either limit is exceeded
+        Returns: (reserved, reason_if_not, reservation) - pass the reservation
+        to release_request() if the API call ends up not being made or billed
+        """
+        day_key, minute_key = self._get_keys()
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.incr(day_key).expire(day_key, 86400 * 2)
+        pipe.incr(minute_key).expire(minute_key, 70)
+        daily_used, _, minute_used, _ = await pipe.execute()
+        
+        reason = ""
+        if daily_used > self.daily_limit:
+            reason = f"Daily limit reached ({daily_used - 1}/{self.daily_limit}). Resets at midnight."
+        elif minute_used > self.minute_limit:
+            reason = f"Rate limit reached ({minute_used - 1}/{self.minute_limit}). Wait {self._seconds_until_slot():.0f} seconds."
+        
+        if reason:
+            await self.release_request((day_key, minute_key))
+            return False, reason, None
+        return True, "", (day_key, minute_key)
+    
+    async def release_request(self, reservation: Optional[tuple]):
+        """Undo a reservation made by reserve_request()"""
+        if reservation is None:
+            return
+        
+        day_key, minute_key = reservation
+        await self._release_script(keys=[day_key, minute_key])
+    
+    async def record_request(self):
+        """Record a successful API request"""
+        day_key, minute_key = self._get_keys()
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.incr(day_key).expire(day_key, 86400 * 2)
+        pipe.incr(minute_key).expire(minute_key, 70)
+        await pipe.execute()
+    
+    async def get_usage_stats(self) -> Dict:
+        """Get current usage statistics"""
+        daily_used, minute_used = await self._get_counts()
+        return _build_usage_stats(daily_used, self.daily_limit, min(minute_used, self.minute_limit), self.minute_limit)
+    
+    async def flush(self):
+        """Nothing to flush - Redis writes are immediate"""
+    
+    async def run_flush_loop(self):
+        """Nothing to flush - Redis writes are immediate"""
+    
+    def _seconds_until_slot(self) -> float:
+        """Seconds until the next minute window starts"""
+        now = datetime.now()
+        return 60 - now.second - now.microsecond / 1_000_000
+    
+    async def wait_if_needed(self) -> Optional[int]:
+        """
+        Wait if we're hitting rate limits
+        Returns: seconds waited (None if no wait needed)
+        """
+        can_request, reason = await self.can_make_request()
+        if can_request or "Rate limit" not in reason:
+            return None
+        
+        wait_seconds = self._seconds_until_slot()
+        print(f"Rate limit hit. Waiting {wait_seconds:.1f} seconds...")
+        await asyncio.sleep(wait_seconds)
+        return int(wait_seconds)
+
+def _build_usage_stats(daily_used: int, daily_limit: int, minute_used: int, minute_limit: int) -> Dict:
+    """Build the usage statistics structure shared by both backends"""
+    return {
+        "daily": {
+            "used": daily_used,
+            "limit": daily_limit,
+            "remaining": daily_limit - daily_used,
+            "percentage": (daily_used / daily_limit) * 100
+        },
+        "minute": {
+            "used": minute_used,
+            "limit": minute_limit,
+            "remaining": minute_limit - minute_used,
+            "percentage": (minute_used / minute_limit) * 100
+        }
+    }
+
+def create_usage_manager():
+    """
+    Create the usage manager selected by the USAGE_BACKEND env var
+    "file" (default): in-process counts persisted to ai_usage.json
+    "redis": shared counts in Redis (REDIS_URL) for multi-worker deployments
+    """
+    backend = os.getenv("USAGE_BACKEND", "file").lower()
+    if backend == "redis":
+        return RedisUsageManager()
+    return AIUsageManager()
\ No newline at end of file
@@ -37,6 +37,10 @@ class CatchLogger:
         
         return catch_data
     
+    def count(self) -> int:
+        """Get the total number of logged catches"""
+        return len(self.catches)
+    
     def get_all_catches(self) -> List[Dict]:
         """Get all catches, sorted by date (newest first)"""
         return sorted(self.catches, key=lambda x: x.get('date', ''), reverse=True)
@@ -1,18 +1,34 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
+from fastapi.responses import ORJSONResponse, HTMLResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+import asyncio
+import contextlib
+import hashlib
+import io
 import json
 import os
+import time
+import orjson
 from ai_image import analyze_fishing_spot
-from ai_image_gemini import analyze_fishing_spot_gemini, analyze_fishing_spot_huggingface, get_usage_stats
+from ai_image_gemini import (
+    analyze_fishing_spot_gemini,
+    analyze_fishing_spots_gemini_batch,
+    analyze_fishing_spot_huggingface,
+    get_usage_stats,
+    close_client,
+    warm_up_client,
+    usage_manager,
+    MAX_BATCH_IMAGES,
+)
 from catch_logger import CatchLogger
 from forecast import get_fishing_forecast
 
-app = FastAPI(title="Fishing Assistant API")
+app = FastAPI(title="Fishing Assistant API", default_response_class=ORJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -23,9 +39,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress text-heavy responses (analyses, catch lists) for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # Initialize catch logger
 catch_logger = CatchLogger()
 
+_usage_flush_task = None
+
+@app.on_event("startup")
+async def start_usage_flusher():
+    """Persist AI usage counts in the background instead of on every request"""
+    global _usage_flush_task
+    _usage_flush_task = asyncio.create_task(usage_manager.run_flush_loop())
+
+@app.on_event("shutdown")
+async def stop_usage_flusher():
+    """Stop the background flush and save any pending usage counts"""
+    if _usage_flush_task is not None:
+        _usage_flush_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await _usage_flush_task
+    await usage_manager.flush()
+
+_warm_up_task = None
+
+@app.on_event("startup")
+async def warm_up_http_client():
+    """Pre-establish the upstream Gemini connection in the background"""
+    global _warm_up_task
+    _warm_up_task = asyncio.create_task(warm_up_client())
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    """Release pooled upstream connections"""
+    if _warm_up_task is not None:
+        _warm_up_task.cancel()
+    await close_client()
+
 class CatchEntry(BaseModel):
     species: str
     bait: str
@@ -39,16 +90,8 @@ class ForecastRequest(BaseModel):
     latitude: Optional[float] = None
     longitude: Optional[float] = None
 
-@app.get("/", response_class=HTMLResponse)
-def read_root():
-    # Get current usage stats
-    try:
-        stats = get_usage_stats()
-        usage_display = f"Daily: {stats['daily']['used']}/{stats['daily']['limit']} ({stats['daily']['percentage']:.1f}%)"
-    except:
-        usage_display = "Usage tracking unavailable"
-    
-    return f"""
+# Landing page template, built once (str.format placeholders, so CSS braces stay doubled)
+_HOMEPAGE_TEMPLATE = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -119,6 +162,13 @@ def read_root():
             <small>Accepts: multipart/form-data with image file</small>
         </div>
         
+        <div class="endpoint">
+            <span class="method">POST</span>
+            <strong>/analyze-batch</strong>
+            <p>📦 Google Gemini analysis of up to {max_batch_images} spots in a single request (uses one quota unit)</p>
+            <small>Accepts: multipart/form-data with multiple image files</small>
+        </div>
+        
         <div class="endpoint">
             <span class="method">GET</span>
             <strong>/usage-stats</strong>
@@ -150,6 +200,52 @@ def read_root():
     </html>
     """
 
+# Usage line on the landing page is refreshed at most every few seconds
+USAGE_DISPLAY_TTL_SECONDS = 5
+_usage_display_cache = (0.0, "")
+
+async def _get_usage_display():
+    """Get the landing page usage line, cached for USAGE_DISPLAY_TTL_SECONDS"""
+    global _usage_display_cache
+    cached_at, usage_display = _usage_display_cache
+    now = time.monotonic()
+    if usage_display and now - cached_at < USAGE_DISPLAY_TTL_SECONDS:
+        return usage_display
+    
+    try:
+        stats = await get_usage_stats()
+        usage_display = f"Daily: {stats['daily']['used']}/{stats['daily']['limit']} ({stats['daily']['percentage']:.1f}%)"
+    except:
+        usage_display = "Usage tracking unavailable"
+    
+    _usage_display_cache = (now, usage_display)
+    return usage_display
+
+@app.get("/", response_class=HTMLResponse)
+async def read_root():
+    usage_display = await _get_usage_display()
+    return _HOMEPAGE_TEMPLATE.format(usage_display=usage_display, max_batch_images=MAX_BATCH_IMAGES)
+
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+MAX_BATCH_UPLOAD_BYTES = 20 * 1024 * 1024  # Combined size of all images in one /analyze-batch call
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+async def read_capped(file: UploadFile, cap: int = MAX_UPLOAD_BYTES, detail: Optional[str] = None) -> bytes:
+    """
+    Read an upload in chunks, rejecting it as soon as it exceeds cap bytes
+    instead of loading the whole file into memory first
+    """
+    detail = detail or f"Image too large (max {cap // (1024 * 1024)}MB)"
+    if file.size is not None and file.size > cap:
+        raise HTTPException(status_code=400, detail=detail)
+    
+    buffer = io.BytesIO()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        buffer.write(chunk)
+        if buffer.tell() > cap:
+            raise HTTPException(status_code=400, detail=detail)
+    return buffer.getvalue()
+
 @app.post("/analyze-smart")
 async def analyze_image_smart(file: UploadFile = File(...)):
     """
@@ -160,24 +256,20 @@ async def analyze_image_smart(file: UploadFile = File(...)):
         if not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Read image bytes
-        image_bytes = await file.read()
-        
-        # Validate file size (max 10MB)
-        if len(image_bytes) > 10 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="Image too large (max 10MB)")
+        # Read image bytes (max 10MB)
+        image_bytes = await read_capped(file)
         
         # Try Google Gemini first
-        analysis = analyze_fishing_spot_gemini(image_bytes)
+        analysis = await analyze_fishing_spot_gemini(image_bytes)
         
         # If quota exceeded, automatically fall back to Hugging Face
         if "Usage limit reached" in analysis or "Rate limit" in analysis:
-            analysis = analyze_fishing_spot_huggingface(image_bytes)
+            analysis = await analyze_fishing_spot_huggingface(image_bytes)
             provider = "Hugging Face (Fallback)"
         else:
             provider = "Google Gemini"
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "success": True,
             "recommendation": analysis,
             "filename": file.filename,
@@ -188,7 +280,7 @@ async def analyze_image_smart(file: UploadFile = File(...)):
         raise
     except Exception as e:
         print(f"Error in smart analyze endpoint: {str(e)}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500, 
             content={
                 "success": False,
@@ -206,17 +298,13 @@ async def analyze_image_gemini_direct(file: UploadFile = File(...)):
         if not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Read image bytes
-        image_bytes = await file.read()
-        
-        # Validate file size (max 10MB)
-        if len(image_bytes) > 10 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="Image too large (max 10MB)")
+        # Read image bytes (max 10MB)
+        image_bytes = await read_capped(file)
         
         # Analyze the image
-        analysis = analyze_fishing_spot_gemini(image_bytes)
+        analysis = await analyze_fishing_spot_gemini(image_bytes)
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "success": True,
             "recommendation": analysis,
             "filename": file.filename,
@@ -227,7 +315,7 @@ async def analyze_image_gemini_direct(file: UploadFile = File(...)):
         raise
     except Exception as e:
         print(f"Error in analyze-gemini endpoint: {str(e)}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500, 
             content={
                 "success": False,
@@ -245,17 +333,13 @@ async def analyze_image_huggingface_direct(file: UploadFile = File(...)):
         if not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Read image bytes
-        image_bytes = await file.read()
-        
-        # Validate file size (max 10MB)
-        if len(image_bytes) > 10 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="Image too large (max 10MB)")
+        # Read image bytes (max 10MB)
+        image_bytes = await read_capped(file)
         
         # Analyze the image
-        analysis = analyze_fishing_spot_huggingface(image_bytes)
+        analysis = await analyze_fishing_spot_huggingface(image_bytes)
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "success": True,
             "recommendation": analysis,
             "filename": file.filename,
@@ -266,7 +350,60 @@ async def analyze_image_huggingface_direct(file: UploadFile = File(...)):
         raise
     except Exception as e:
         print(f"Error in analyze-hf endpoint: {str(e)}")
-        return JSONResponse(
+        return ORJSONResponse(
+            status_code=500, 
+            content={
+                "success": False,
+                "error": f"Analysis failed: {str(e)}"
+            }
+        )
+
+@app.post("/analyze-batch")
+async def analyze_images_batch(files: List[UploadFile] = File(...)):
+    """
+    Google Gemini analysis of several spots packed into one API request
+    """
+    try:
+        if len(files) > MAX_BATCH_IMAGES:
+            raise HTTPException(status_code=400, detail=f"Too many images (max {MAX_BATCH_IMAGES})")
+        
+        images = []
+        remaining = MAX_BATCH_UPLOAD_BYTES
+        for file in files:
+            # Validate file type
+            if not file.content_type.startswith('image/'):
+                raise HTTPException(status_code=400, detail=f"{file.filename} must be an image")
+            
+            # Read image bytes (max 10MB each, 20MB for the whole batch)
+            if remaining < MAX_UPLOAD_BYTES:
+                image_bytes = await read_capped(
+                    file,
+                    cap=remaining,
+                    detail=f"Batch too large (max {MAX_BATCH_UPLOAD_BYTES // (1024 * 1024)}MB in total)",
+                )
+            else:
+                image_bytes = await read_capped(file)
+            remaining -= len(image_bytes)
+            
+            images.append(image_bytes)
+        
+        # Analyze all images in one call
+        analyses = await analyze_fishing_spots_gemini_batch(images)
+        
+        return ORJSONResponse(content={
+            "success": True,
+            "results": [
+                {"filename": file.filename, "recommendation": analysis}
+                for file, analysis in zip(files, analyses, strict=True)
+            ],
+            "provider": "Google Gemini"
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in analyze-batch endpoint: {str(e)}")
+        return ORJSONResponse(
             status_code=500, 
             content={
                 "success": False,
@@ -278,30 +415,58 @@ async def analyze_image_huggingface_direct(file: UploadFile = File(...)):
 async def get_ai_usage_stats():
     """Get current AI API usage statistics"""
     try:
-        stats = get_usage_stats()
-        return JSONResponse(content={
+        stats = await get_usage_stats()
+        return ORJSONResponse(content={
             "success": True,
             "usage": stats
         })
     except Exception as e:
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "success": False,
             "error": str(e)
         })
 
+# Serialized GET /catches body and its ETag, rebuilt only after a new catch is logged
+_catches_cache: Optional[bytes] = None
+_catches_etag: str = ""
+
+def _get_catches_body() -> tuple[bytes, str]:
+    """Get the serialized catch list and its ETag, rebuilding them if invalidated"""
+    global _catches_cache, _catches_etag
+    if _catches_cache is None:
+        _catches_cache = orjson.dumps(catch_logger.get_all_catches())
+        # Weak validator - GZipMiddleware may serve a different encoding of the same body
+        _catches_etag = f'W/"{hashlib.md5(_catches_cache).hexdigest()}"'
+    return _catches_cache, _catches_etag
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque_tag for tag in if_none_match.split(","))
+
 @app.post("/catches")
 async def log_catch(catch_entry: CatchEntry):
+    global _catches_cache
     try:
         result = catch_logger.add_catch(catch_entry.dict())
-        return {"message": f"Catch logged successfully! Total catches: {len(catch_logger.get_all_catches())}"}
+        return {"message": f"Catch logged successfully! Total catches: {catch_logger.count()}"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # The in-memory list may have changed even if saving it failed
+        _catches_cache = None
 
 @app.get("/catches")
-async def get_catches():
+async def get_catches(request: Request):
     try:
-        catches = catch_logger.get_all_catches()
-        return catches
+        body, etag = _get_catches_body()
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
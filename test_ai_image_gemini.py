@@ -0,0 +1,37 @@
+from ai_image_gemini import _split_batch_analysis
+
+COMBINED = "ℹ️ See the combined analysis in the first result."
+
+
+def test_split_batch_analysis_splits_on_headings():
+    text = "Intro\n**SPOT 1: Rocky point**\nUse jigs\n## Spot #2 - Pond\nUse frogs"
+    assert _split_batch_analysis(text, 2) == [
+        "**SPOT 1: Rocky point**\nUse jigs",
+        "## Spot #2 - Pond\nUse frogs",
+    ]
+
+
+def test_split_batch_analysis_ignores_body_lines_starting_with_spot():
+    text = (
+        "SPOT 1\nUse jigs\nSpot 2 is better than spot 1.\n\n"
+        "SPOT 2\nUse frogs\n\nSpot 1 is the stronger pick overall."
+    )
+    assert _split_batch_analysis(text, 2) == [
+        "SPOT 1\nUse jigs\nSpot 2 is better than spot 1.",
+        "SPOT 2\nUse frogs\n\nSpot 1 is the stronger pick overall.",
+    ]
+
+
+def test_split_batch_analysis_falls_back_on_repeated_heading():
+    text = "SPOT 1\nUse jigs\nSPOT 2\nUse frogs\nSPOT 1:\nRecap"
+    assert _split_batch_analysis(text, 2) == [text, COMBINED]
+
+
+def test_split_batch_analysis_falls_back_on_out_of_order_headings():
+    text = "SPOT 2\nUse frogs\nSPOT 1\nUse jigs"
+    assert _split_batch_analysis(text, 2) == [text, COMBINED]
+
+
+def test_split_batch_analysis_falls_back_without_headings():
+    text = "Image 1: jigs\nImage 2: frogs"
+    assert _split_batch_analysis(text, 2) == [text, COMBINED]